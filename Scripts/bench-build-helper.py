@@ -0,0 +1,339 @@
+#!/usr/bin/env python3
+"""
+build-helper.py 离线基准测试脚本
+针对本地 mock 服务运行 check-versions / should-build / cleanup-all，
+记录耗时、请求数量和峰值内存，输出可供 CI 逐提交比较的 JSON 结果
+"""
+import sys
+import json
+import os
+import re
+import shutil
+import statistics
+import subprocess
+import tempfile
+import threading
+import time
+import urllib.request
+from datetime import datetime, timezone
+from typing import Dict, List, Tuple
+
+
+SCRIPTS_DIR = os.path.dirname(os.path.abspath(__file__))
+BUILD_HELPER = os.path.join(SCRIPTS_DIR, "build-helper.py")
+MOCK_REGISTRY = os.path.join(SCRIPTS_DIR, "mock-registry.py")
+
+# 压测场景，参数直接传给 mock-registry.py
+SCENARIOS: Dict[str, Dict[str, str]] = {
+    "baseline": {},
+    "update-available": {"bump": "1"},
+    "new-major": {"extra-majors": "1"},
+    "many-hub-pages": {"hub-tags": "5000"},
+    "many-ghcr-versions": {"ghcr-versions": "3000", "ghcr-old-tags": "20"},
+    "slow": {"latency-ms": "200", "jitter-ms": "100"},
+    "flaky": {"error-rate": "0.1"},
+    "rate-limited": {"rate-limit-rate": "0.2"},
+    "update-and-new-major": {"bump": "2", "extra-majors": "1"},
+}
+
+# 运行后需要校验 pg_version.json 的命令
+VERSION_CHECK_COMMANDS = ["check-versions", "check-versions-full"]
+
+# 参与比较的指标；requests、response_bytes、ghcr_stale_tags 与机器无关，适合作为 CI 门禁
+METRICS = ["wall_s", "requests", "response_bytes", "max_rss_kb", "ghcr_stale_tags"]
+
+COMMANDS: Dict[str, List[str]] = {
+    "check-versions": ["check-versions"],
+    "check-versions-full": ["check-versions", "--full"],
+    "should-build": ["should-build", "{latest_major}"],
+    "cleanup-all": ["cleanup-all"],
+}
+
+
+def start_mock(scenario: str, versions_file: str) -> Tuple[subprocess.Popen, str]:
+    """启动 mock 服务，返回进程和服务地址"""
+    cmd = [sys.executable, MOCK_REGISTRY, "--versions", versions_file]
+    for key, value in SCENARIOS[scenario].items():
+        cmd += [f"--{key}", value]
+
+    proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, text=True)
+    line = proc.stdout.readline()
+    match = re.search(r'(http://\S+)', line)
+    if not match:
+        proc.kill()
+        raise RuntimeError(f"mock 服务启动失败: {line.strip()}")
+    return proc, match.group(1)
+
+
+def get_mock_stats(base_url: str) -> Dict:
+    """读取 mock 服务的请求统计"""
+    with urllib.request.urlopen(f"{base_url}/_stats", timeout=10) as response:
+        return json.load(response)
+
+
+def run_command(argv: List[str], base_url: str, workdir: str, timeout: int) -> Dict:
+    """
+    在隔离目录中运行 build-helper.py 命令
+
+    Returns:
+        耗时、退出码和峰值内存（KB）
+    """
+    env = dict(os.environ)
+    for key in ("GITHUB_OUTPUT", "GITHUB_STEP_SUMMARY"):
+        env.pop(key, None)
+    env.update({
+        "DOCKER_HUB_API": f"{base_url}/v2",
+        "GITHUB_API_URL": base_url,
+        "PG_FTP_URL": f"{base_url}/pub/source/",
+        "GITHUB_TOKEN": "mock-token",
+    })
+
+    log_path = os.path.join(workdir, "output.log")
+    with open(log_path, 'w') as log:
+        started = time.perf_counter()
+        proc = subprocess.Popen(
+            [sys.executable, BUILD_HELPER] + argv,
+            cwd=workdir, env=env, stdout=log, stderr=subprocess.STDOUT
+        )
+        timer = threading.Timer(timeout, proc.kill)
+        timer.start()
+        try:
+            # wait4 可以拿到单个子进程的 rusage，用于统计峰值内存
+            _, status, usage = os.wait4(proc.pid, 0)
+        finally:
+            timer.cancel()
+        wall = time.perf_counter() - started
+        proc.returncode = os.waitstatus_to_exitcode(status)
+
+    return {
+        "wall_s": round(wall, 3),
+        "exit_code": proc.returncode,
+        "max_rss_kb": usage.ru_maxrss,
+    }
+
+
+def expected_versions(scenario: str, stored: Dict[str, str]) -> Dict[str, str]:
+    """根据场景的 bump / extra-majors 参数推算 check-versions 应写入的版本"""
+    args = SCENARIOS[scenario]
+    bump = int(args.get("bump", "0"))
+    expected = {}
+    for major, version in stored.items():
+        expected[major] = f"{major}.{int(version.split('.')[1]) + bump}"
+    top = max(int(m) for m in stored)
+    for i in range(1, int(args.get("extra-majors", "0")) + 1):
+        expected[str(top + i)] = f"{top + i}.0"
+    return expected
+
+
+def run_scenario(scenario: str, repeat: int, timeout: int) -> Dict[str, dict]:
+    """在指定场景下依次运行所有命令，每次运行使用全新的 mock 服务"""
+    print(f"\n▶ 场景: {scenario} {json.dumps(SCENARIOS[scenario]) if SCENARIOS[scenario] else ''}")
+
+    with open('pg_version.json', 'r') as f:
+        stored = json.load(f)
+    latest_major = max(stored.keys(), key=int)
+    expected = expected_versions(scenario, stored)
+
+    results = {}
+    for name, template in COMMANDS.items():
+        argv = [arg.format(latest_major=latest_major) for arg in template]
+        runs = []
+
+        for _ in range(repeat):
+            workdir = tempfile.mkdtemp(prefix="bench-build-helper-")
+            try:
+                shutil.copy('pg_version.json', workdir)
+                shutil.copy('README.md', workdir)
+                versions_file = os.path.join(workdir, "pg_version.json")
+
+                proc, base_url = start_mock(scenario, versions_file)
+                try:
+                    run = run_command(argv, base_url, workdir, timeout)
+                    run["requests"] = get_mock_stats(base_url)
+                    if name in VERSION_CHECK_COMMANDS:
+                        with open(versions_file, 'r') as f:
+                            run["versions"] = json.load(f)
+                finally:
+                    proc.kill()
+                    proc.wait()
+            finally:
+                shutil.rmtree(workdir, ignore_errors=True)
+            runs.append(run)
+
+        requests_stats = runs[0]["requests"]
+        results[name] = {
+            "argv": argv,
+            "exit_code": runs[0]["exit_code"],
+            "wall_s": round(statistics.median(r["wall_s"] for r in runs), 3),
+            "max_rss_kb": max(r["max_rss_kb"] for r in runs),
+            "requests": requests_stats["total"],
+            "requests_by_route": requests_stats["routes"],
+            "requests_by_status": requests_stats["status"],
+            "response_bytes": requests_stats["bytes"],
+            "ghcr_stale_tags": len(requests_stats["ghcr_stale_tags"]),
+        }
+        if name in VERSION_CHECK_COMMANDS:
+            wrong = [r["versions"] for r in runs if r["versions"] != expected]
+            results[name]["versions_ok"] = not wrong
+            if wrong:
+                results[name]["versions"] = wrong[0]
+                results[name]["expected_versions"] = expected
+        print(f"  {name:<20} {results[name]['wall_s']:>8}s  "
+              f"请求 {results[name]['requests']:>5}  "
+              f"内存 {results[name]['max_rss_kb']}KB  退出码 {results[name]['exit_code']}"
+              + (f"  残留旧标签 {results[name]['ghcr_stale_tags']}" if name == "cleanup-all" else "")
+              + ("" if results[name].get("versions_ok", True) else "  ✗ pg_version.json 与预期不符"))
+
+    return results
+
+
+def flatten_metrics(results: dict) -> Dict[str, float]:
+    """将结果展开为 "场景.命令.指标" 形式，仅保留用于比较的数值"""
+    metrics = {}
+    for scenario, commands in results.get("scenarios", {}).items():
+        for command, data in commands.items():
+            for name in METRICS:
+                if name in data:
+                    metrics[f"{scenario}.{command}.{name}"] = data[name]
+    return metrics
+
+
+def compare_results(base_file: str, head_file: str, threshold: float, metrics: List[str]) -> bool:
+    """
+    比较两次基准测试结果
+
+    请求数量和残留旧标签数是确定值，任何增加都视为退化；其余指标超过阈值才视为退化
+
+    Args:
+        base_file: 基准结果文件
+        head_file: 当前结果文件
+        threshold: 判定为退化的变化百分比
+        metrics: 参与比较的指标名
+
+    Returns:
+        True 如果存在退化
+    """
+    with open(base_file, 'r') as f:
+        base = flatten_metrics(json.load(f))
+    with open(head_file, 'r') as f:
+        head = flatten_metrics(json.load(f))
+
+    table = "## ⏱️ build-helper 基准测试对比\n\n"
+    table += "| 指标 | 基准 | 当前 | 变化 |\n"
+    table += "|------|------|------|------|\n"
+
+    regressed = False
+    for key in sorted(set(base) & set(head)):
+        if key.rsplit(".", 1)[-1] not in metrics:
+            continue
+        old, new = base[key], head[key]
+        change = (new - old) / old * 100 if old else 0.0
+
+        mark = ""
+        exact = key.endswith(".requests") or key.endswith(".ghcr_stale_tags")
+        if (exact and new > old) or change > threshold:
+            mark = " ⚠️"
+            regressed = True
+
+        table += f"| {key} | {old} | {new} | {change:+.1f}%{mark} |\n"
+
+    print(table)
+
+    github_step_summary = os.getenv('GITHUB_STEP_SUMMARY')
+    if github_step_summary:
+        with open(github_step_summary, 'a') as f:
+            f.write(table)
+
+    return regressed
+
+
+def parse_options(argv: List[str]) -> Dict[str, str]:
+    """解析 --key value 形式的参数"""
+    options = {}
+    for i in range(0, len(argv), 2):
+        if not argv[i].startswith("--") or i + 1 >= len(argv):
+            print(f"❌ 无法识别的参数: {argv[i]}")
+            sys.exit(1)
+        options[argv[i][2:]] = argv[i + 1]
+    return options
+
+
+def main():
+    """主函数"""
+    if len(sys.argv) < 2 or sys.argv[1] not in ("run", "compare"):
+        print("用法: bench-build-helper.py <command> [args...]")
+        print("命令:")
+        print("  run [--scenarios a,b] [--repeat N] [--timeout S] [--output FILE]")
+        print("                                         - 运行基准测试并写入 JSON 结果")
+        print("  compare <base.json> <head.json> [--threshold 20] [--metrics requests,ghcr_stale_tags]")
+        print("                                         - 比较两次结果，存在退化时返回非零")
+        print("场景:")
+        for name, args in SCENARIOS.items():
+            print(f"  {name:<22} {json.dumps(args) if args else '(默认)'}")
+        sys.exit(1)
+
+    command = sys.argv[1]
+
+    try:
+        if command == "compare":
+            if len(sys.argv) < 4:
+                print("❌ 缺少参数: base.json, head.json")
+                sys.exit(1)
+
+            options = parse_options(sys.argv[4:])
+            metrics = options.get("metrics", ",".join(METRICS)).split(",")
+            regressed = compare_results(sys.argv[2], sys.argv[3], float(options.get("threshold", "20")), metrics)
+            sys.exit(1 if regressed else 0)
+
+        options = parse_options(sys.argv[2:])
+        scenarios = options.get("scenarios", ",".join(SCENARIOS.keys())).split(",")
+        repeat = int(options.get("repeat", "3"))
+        timeout = int(options.get("timeout", "600"))
+        output = options.get("output", "bench-build-helper.json")
+
+        for scenario in scenarios:
+            if scenario not in SCENARIOS:
+                print(f"❌ 未知场景: {scenario}")
+                sys.exit(1)
+
+        print("=" * 60)
+        print("build-helper 离线基准测试")
+        print("=" * 60)
+
+        results = {
+            "meta": {
+                "python": sys.version.split()[0],
+                "repeat": repeat,
+                "timestamp": datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ"),
+            },
+            "scenarios": {},
+        }
+
+        for scenario in scenarios:
+            results["scenarios"][scenario] = run_scenario(scenario, repeat, timeout)
+
+        with open(output, 'w') as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+            f.write("\n")
+
+        print(f"\n✓ 结果已写入 {output}")
+
+        failed = [
+            f"{scenario}.{command}"
+            for scenario, commands in results["scenarios"].items()
+            for command, data in commands.items()
+            if not data.get("versions_ok", True)
+        ]
+        if failed:
+            print(f"❌ pg_version.json 与预期不符: {', '.join(failed)}")
+            sys.exit(1)
+
+    except Exception as e:
+        print(f"❌ 执行失败: {e}")
+        import traceback
+        traceback.print_exc()
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
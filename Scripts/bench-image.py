@@ -0,0 +1,507 @@
+#!/usr/bin/env python3
+"""
+镜像性能基准测试脚本
+在本地启动容器，测量初始化耗时、CREATE DATABASE 延迟、pgbench TPS 和 PostGIS 空间连接，
+并对比不同入口脚本 GUC 配置，输出可供 CI 逐提交比较的 JSON 结果
+"""
+import sys
+import json
+import os
+import re
+import statistics
+import subprocess
+import time
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
+
+
+BENCH_IMAGE = "postgresql-postgis:bench"
+BENCH_PASSWORD = "bench"
+
+# 对比的 GUC 配置，通过 docker-entrypoint.sh 支持的环境变量覆盖默认值
+PROFILES: Dict[str, Dict[str, str]] = {
+    "default": {},
+    "plain-logs": {
+        "POSTGRES_COLORIZE_LOGS": "false",
+    },
+    "quiet-logging": {
+        "POSTGRES_LOG_STATEMENT": "none",
+        "POSTGRES_LOG_MIN_DURATION_STATEMENT": "-1",
+        "POSTGRES_LOG_CONNECTIONS": "off",
+        "POSTGRES_LOG_DISCONNECTIONS": "off",
+        "POSTGRES_PGAUDIT_LOG": "none",
+    },
+    "explain-no-analyze": {
+        "POSTGRES_AUTO_EXPLAIN_LOG_ANALYZE": "off",
+        "POSTGRES_AUTO_EXPLAIN_LOG_BUFFERS": "off",
+        "POSTGRES_AUTO_EXPLAIN_LOG_TIMING": "off",
+    },
+    "pgss-top": {
+        "POSTGRES_PG_STAT_STATEMENTS_TRACK": "top",
+    },
+}
+
+# 初始化脚本与阶段名的对应关系；官方 docker-entrypoint.sh 对 .sql 和可执行 .sh 输出
+# "running <file>"，对不可执行的 .sh（如 03-create-extra-databases.sh）输出 "sourcing <file>"
+INIT_SCRIPTS = {
+    "01-install-extensions-template1.sql": "template1_sql",
+    "03-create-extra-databases.sh": "extra_databases",
+    "99-enable-all-extensions.sql": "enable_all_sql",
+}
+INIT_SCRIPT_PATTERN = re.compile(r'(?:running|sourcing) /docker-entrypoint-initdb\.d/(\S+)')
+INIT_COMPLETE_MARKER = "PostgreSQL init process complete"
+SERVER_READY_MARKER = "database system is ready to accept connections"
+INIT_PHASES = ["initdb"] + list(INIT_SCRIPTS.values()) + ["restart"]
+
+SPATIAL_SETUP_SQL = """
+SELECT setseed(0.42);
+DROP TABLE IF EXISTS bench_points, bench_polygons;
+CREATE TABLE bench_points AS
+    SELECT id, ST_SetSRID(ST_MakePoint(random() * 10000, random() * 10000), 3857) AS geom
+    FROM generate_series(1, :points) AS id;
+CREATE TABLE bench_polygons AS
+    SELECT id, ST_Buffer(ST_SetSRID(ST_MakePoint(random() * 10000, random() * 10000), 3857), 50) AS geom
+    FROM generate_series(1, :polygons) AS id;
+CREATE INDEX ON bench_points USING gist (geom);
+CREATE INDEX ON bench_polygons USING gist (geom);
+ANALYZE bench_points;
+ANALYZE bench_polygons;
+"""
+
+SPATIAL_QUERY_SQL = """
+SELECT count(*) FROM bench_polygons p JOIN bench_points t ON ST_Intersects(p.geom, t.geom);
+"""
+
+ANSI_PATTERN = re.compile(r'\x1b\[[0-9;]*m')
+TIMING_PATTERN = re.compile(r'^Time: ([\d.]+) ms', re.MULTILINE)
+
+
+def run(cmd: List[str], input_text: Optional[str] = None, check: bool = True) -> subprocess.CompletedProcess:
+    """执行命令并返回结果"""
+    result = subprocess.run(cmd, input=input_text, capture_output=True, text=True)
+    if check and result.returncode != 0:
+        raise RuntimeError(f"命令执行失败: {' '.join(cmd)}\n{result.stderr.strip()}")
+    return result
+
+
+def psql(container: str, sql: str, dbname: str = "postgres", variables: Optional[Dict[str, str]] = None) -> str:
+    """在容器内通过 psql 执行 SQL 脚本，返回标准输出"""
+    cmd = ["docker", "exec", "-i", container, "psql", "-U", "postgres", "-d", dbname,
+           "-v", "ON_ERROR_STOP=1", "-X", "-q"]
+    for key, value in (variables or {}).items():
+        cmd += ["-v", f"{key}={value}"]
+    return run(cmd, input_text=sql).stdout
+
+
+def summarize(samples: List[float], expected: int, output: str) -> Dict[str, float]:
+    """
+    计算样本统计值
+
+    Args:
+        samples: 从 psql \\timing 输出解析出的耗时
+        expected: 预期样本数（迭代次数）
+        output: psql 原始输出，样本数不符时用于排查
+
+    Raises:
+        RuntimeError: 样本数与迭代次数不一致
+    """
+    if not samples or len(samples) != expected:
+        raise RuntimeError(f"预期 {expected} 个计时样本，实际解析到 {len(samples)} 个，psql 输出:\n{output}")
+
+    return {
+        "min": round(min(samples), 3),
+        "median": round(statistics.median(samples), 3),
+        "max": round(max(samples), 3),
+        "samples": len(samples),
+    }
+
+
+def parse_timestamp(value: str) -> float:
+    """解析 docker logs --timestamps 的 RFC3339Nano 时间戳"""
+    value = value.rstrip("Z")
+    if "." in value:
+        head, frac = value.split(".", 1)
+        value = f"{head}.{frac[:6]}"
+    return datetime.fromisoformat(value).replace(tzinfo=timezone.utc).timestamp()
+
+
+def get_pg_version() -> Dict[str, str]:
+    """读取 pg_version.json 中的版本"""
+    with open('pg_version.json', 'r') as f:
+        return json.load(f)
+
+
+def get_git_commit() -> str:
+    """获取当前提交 ID"""
+    result = run(["git", "rev-parse", "HEAD"], check=False)
+    return result.stdout.strip() if result.returncode == 0 else "unknown"
+
+
+def build_image(pg_major: str, image: str) -> None:
+    """使用当前工作区的 Dockerfile 构建基准测试镜像"""
+    versions = get_pg_version()
+    pg_version = versions.get(pg_major)
+    if not pg_version:
+        print(f"❌ 未找到 PostgreSQL {pg_major} 的版本信息")
+        sys.exit(1)
+
+    print(f"🔨 构建基准测试镜像: {image} (PostgreSQL {pg_version})")
+    subprocess.run(
+        ["docker", "build", "--tag", image,
+         "--build-arg", f"PG_MAJOR={pg_major}",
+         "--build-arg", f"PG_VERSION={pg_version}", "."],
+        check=True
+    )
+
+
+def start_container(image: str, name: str, env: Dict[str, str]) -> float:
+    """启动容器，返回执行 docker run 前的本机时刻"""
+    cmd = ["docker", "run", "-d", "--name", name, "-e", f"POSTGRES_PASSWORD={BENCH_PASSWORD}"]
+    for key, value in env.items():
+        cmd += ["-e", f"{key}={value}"]
+    cmd.append(image)
+
+    started = time.time()
+    run(cmd)
+    return started
+
+
+def wait_until_ready(container: str, timeout: int) -> float:
+    """
+    等待初始化完成并接受 TCP 连接
+
+    初始化期间的临时服务只监听 Unix socket，因此通过 127.0.0.1 探测
+    可以区分临时服务和正式服务
+
+    Returns:
+        就绪时刻
+    """
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        result = run(["docker", "exec", container, "pg_isready", "-h", "127.0.0.1", "-U", "postgres"], check=False)
+        if result.returncode == 0:
+            return time.time()
+
+        state = run(["docker", "inspect", "-f", "{{.State.Running}}", container], check=False)
+        if state.stdout.strip() != "true":
+            logs = run(["docker", "logs", "--tail", "50", container], check=False)
+            raise RuntimeError(f"容器意外退出:\n{logs.stdout}{logs.stderr}")
+
+        time.sleep(0.1)
+
+    raise RuntimeError(f"等待容器就绪超时 ({timeout}s)")
+
+
+def measure_init_phases(container: str, started: float, ready: float) -> Dict[str, Optional[float]]:
+    """
+    根据带时间戳的容器日志拆分初始化各阶段耗时（秒）
+
+    initdb 从容器 State.StartedAt 算起，各阶段均使用 Docker 守护进程的时钟，与本机时钟无关；
+    time_to_ready 按本机时钟从 docker run 计到 TCP 就绪，包含容器创建耗时。
+    每个初始化脚本的耗时从其 running/sourcing 行开始，到下一个脚本或初始化完成为止；
+    日志中缺少标记的阶段记为 null 并输出警告，而不是从结果中省略
+    """
+    state = run(["docker", "inspect", "-f", "{{.State.StartedAt}}", container], check=False)
+    container_started = parse_timestamp(state.stdout.strip()) if state.returncode == 0 else None
+
+    logs = run(["docker", "logs", "--timestamps", container], check=False)
+    events = []
+    complete = None
+    server_ready = None
+
+    for line in sorted((logs.stdout + logs.stderr).splitlines()):
+        stamp, _, message = line.partition(" ")
+        message = ANSI_PATTERN.sub("", message)
+        match = INIT_SCRIPT_PATTERN.search(message)
+        if match:
+            events.append((parse_timestamp(stamp), match.group(1)))
+        elif complete is None and INIT_COMPLETE_MARKER in message:
+            complete = parse_timestamp(stamp)
+        elif complete is not None and server_ready is None and SERVER_READY_MARKER in message:
+            server_ready = parse_timestamp(stamp)
+
+    phases: Dict[str, Optional[float]] = {phase: None for phase in INIT_PHASES}
+    phases["time_to_ready"] = round(ready - started, 3)
+
+    if events and container_started is not None:
+        phases["initdb"] = round(events[0][0] - container_started, 3)
+    for i, (stamp, script) in enumerate(events):
+        end = events[i + 1][0] if i + 1 < len(events) else complete
+        if script in INIT_SCRIPTS and end is not None:
+            phases[INIT_SCRIPTS[script]] = round(end - stamp, 3)
+    if complete is not None and server_ready is not None:
+        phases["restart"] = round(server_ready - complete, 3)
+
+    missing = [phase for phase, value in phases.items() if value is None]
+    if missing:
+        print(f"  ⚠️ 日志中缺少初始化阶段标记: {', '.join(missing)}", file=sys.stderr)
+
+    return phases
+
+
+def measure_create_database(container: str, iterations: int) -> Dict[str, float]:
+    """测量 CREATE DATABASE 延迟（毫秒），新库从 template1 继承全部扩展"""
+    create_sql = "\\timing on\n" + "".join(
+        f"CREATE DATABASE bench_create_{i};\n" for i in range(iterations)
+    )
+    output = psql(container, create_sql)
+    samples = [float(x) for x in TIMING_PATTERN.findall(output)]
+
+    drop_sql = "".join(f"DROP DATABASE IF EXISTS bench_create_{i};\n" for i in range(iterations))
+    psql(container, drop_sql)
+
+    return summarize(samples, iterations, output)
+
+
+def measure_pgbench(container: str, scale: int, clients: int, duration: int) -> Dict[str, float]:
+    """运行 pgbench 并解析 TPS 和平均延迟"""
+    psql(container, "CREATE DATABASE bench_pgbench;")
+    run(["docker", "exec", container, "pgbench", "-U", "postgres", "-i", "-q", "-s", str(scale), "bench_pgbench"])
+
+    result = run([
+        "docker", "exec", container, "pgbench", "-U", "postgres",
+        "-c", str(clients), "-j", str(clients), "-T", str(duration), "-n", "bench_pgbench"
+    ])
+
+    tps = re.search(r'^tps = ([\d.]+)', result.stdout, re.MULTILINE)
+    latency = re.search(r'^latency average = ([\d.]+) ms', result.stdout, re.MULTILINE)
+    if not tps:
+        raise RuntimeError(f"无法解析 pgbench 输出:\n{result.stdout}")
+
+    return {
+        "tps": round(float(tps.group(1)), 3),
+        "latency_avg_ms": round(float(latency.group(1)), 3) if latency else None,
+        "scale": scale,
+        "clients": clients,
+        "duration_s": duration,
+    }
+
+
+def measure_spatial_join(container: str, points: int, polygons: int, iterations: int) -> Dict[str, float]:
+    """测量 PostGIS 点面空间连接查询耗时（毫秒）"""
+    psql(container, "CREATE DATABASE bench_spatial;")
+    psql(container, SPATIAL_SETUP_SQL, dbname="bench_spatial",
+         variables={"points": str(points), "polygons": str(polygons)})
+
+    # 先执行一次预热缓存，不计入结果
+    query_sql = "\\timing on\n" + SPATIAL_QUERY_SQL * (iterations + 1)
+    output = psql(container, query_sql, dbname="bench_spatial")
+    samples = [float(x) for x in TIMING_PATTERN.findall(output)][1:]
+
+    result = summarize(samples, iterations, output)
+    result.update({"points": points, "polygons": polygons})
+    return result
+
+
+def run_profile(profile: str, image: str, args: Dict[str, int]) -> Dict[str, dict]:
+    """使用指定 GUC 配置运行一轮完整基准测试"""
+    container = f"pg-bench-{profile}-{os.getpid()}"
+    env = PROFILES[profile]
+
+    print(f"\n▶ 配置: {profile} {json.dumps(env, ensure_ascii=False) if env else '(入口脚本默认值)'}")
+
+    try:
+        started = start_container(image, container, env)
+        ready = wait_until_ready(container, args["timeout"])
+        init = measure_init_phases(container, started, ready)
+        print(f"  就绪耗时: {init['time_to_ready']}s")
+
+        create_db = measure_create_database(container, args["create_iterations"])
+        print(f"  CREATE DATABASE 中位数: {create_db['median']}ms")
+
+        pgbench = measure_pgbench(container, args["scale"], args["clients"], args["duration"])
+        print(f"  pgbench TPS: {pgbench['tps']}")
+
+        spatial = measure_spatial_join(container, args["points"], args["polygons"], args["spatial_iterations"])
+        print(f"  空间连接中位数: {spatial['median']}ms")
+    finally:
+        run(["docker", "rm", "-f", "-v", container], check=False)
+
+    return {
+        "env": env,
+        "init_s": init,
+        "create_database_ms": create_db,
+        "pgbench": pgbench,
+        "spatial_join_ms": spatial,
+    }
+
+
+def flatten_metrics(results: dict) -> Dict[str, float]:
+    """将结果展开为 "配置.分组.指标" 形式，仅保留用于比较的数值"""
+    metrics = {}
+    for profile, data in results.get("profiles", {}).items():
+        for name, value in data.get("init_s", {}).items():
+            if value is not None:
+                metrics[f"{profile}.init_s.{name}"] = value
+        for group in ("create_database_ms", "spatial_join_ms"):
+            if group in data:
+                metrics[f"{profile}.{group}.median"] = data[group]["median"]
+        if "pgbench" in data:
+            metrics[f"{profile}.pgbench.tps"] = data["pgbench"]["tps"]
+            if data["pgbench"].get("latency_avg_ms") is not None:
+                metrics[f"{profile}.pgbench.latency_avg_ms"] = data["pgbench"]["latency_avg_ms"]
+    return metrics
+
+
+def compare_results(base_file: str, head_file: str, threshold: float) -> bool:
+    """
+    比较两次基准测试结果
+
+    Args:
+        base_file: 基准结果文件
+        head_file: 当前结果文件
+        threshold: 判定为退化的变化百分比
+
+    Returns:
+        True 如果存在超过阈值的退化
+    """
+    with open(base_file, 'r') as f:
+        base = flatten_metrics(json.load(f))
+    with open(head_file, 'r') as f:
+        head = flatten_metrics(json.load(f))
+
+    table = "## ⏱️ 镜像基准测试对比\n\n"
+    table += "| 指标 | 基准 | 当前 | 变化 |\n"
+    table += "|------|------|------|------|\n"
+
+    regressed = False
+    for key in sorted(set(base) - set(head)):
+        table += f"| {key} | {base[key]} | 缺失 | ⚠️ |\n"
+        regressed = True
+
+    for key in sorted(set(base) & set(head)):
+        old, new = base[key], head[key]
+        change = (new - old) / old * 100 if old else 0.0
+
+        # TPS 越高越好，其余指标越低越好
+        worse = -change if key.endswith(".tps") else change
+        mark = ""
+        if worse > threshold:
+            mark = " ⚠️"
+            regressed = True
+
+        table += f"| {key} | {old} | {new} | {change:+.1f}%{mark} |\n"
+
+    print(table)
+
+    github_step_summary = os.getenv('GITHUB_STEP_SUMMARY')
+    if github_step_summary:
+        with open(github_step_summary, 'a') as f:
+            f.write(table)
+
+    return regressed
+
+
+def parse_options(argv: List[str]) -> Dict[str, str]:
+    """解析 --key value 形式的参数"""
+    options = {}
+    i = 0
+    while i < len(argv):
+        arg = argv[i]
+        if not arg.startswith("--"):
+            print(f"❌ 无法识别的参数: {arg}")
+            sys.exit(1)
+        key = arg[2:]
+        if key == "build":
+            options[key] = "true"
+            i += 1
+            continue
+        if i + 1 >= len(argv):
+            print(f"❌ 缺少参数值: {arg}")
+            sys.exit(1)
+        options[key] = argv[i + 1]
+        i += 2
+    return options
+
+
+def main():
+    """主函数"""
+    if len(sys.argv) < 2 or sys.argv[1] not in ("run", "compare"):
+        print("用法: bench-image.py <command> [args...]")
+        print("命令:")
+        print("  run [--build] [--pg-major 18] [--image IMAGE] [--profiles a,b]")
+        print("      [--output FILE] [--scale N] [--clients N] [--duration N]")
+        print("                                         - 运行基准测试并写入 JSON 结果")
+        print("  compare <base.json> <head.json> [--threshold 10]")
+        print("                                         - 比较两次结果，超过阈值的退化返回非零")
+        print("配置:")
+        for name, env in PROFILES.items():
+            print(f"  {name:<22} {json.dumps(env, ensure_ascii=False) if env else '(入口脚本默认值)'}")
+        sys.exit(1)
+
+    command = sys.argv[1]
+
+    try:
+        if command == "compare":
+            if len(sys.argv) < 4:
+                print("❌ 缺少参数: base.json, head.json")
+                sys.exit(1)
+
+            options = parse_options(sys.argv[4:])
+            regressed = compare_results(sys.argv[2], sys.argv[3], float(options.get("threshold", "10")))
+            sys.exit(1 if regressed else 0)
+
+        options = parse_options(sys.argv[2:])
+        versions = get_pg_version()
+        pg_major = options.get("pg-major", max(versions.keys(), key=int))
+        image = options.get("image", BENCH_IMAGE)
+        profiles = options.get("profiles", ",".join(PROFILES.keys())).split(",")
+        output = options.get("output", "bench-results.json")
+
+        for profile in profiles:
+            if profile not in PROFILES:
+                print(f"❌ 未知配置: {profile}")
+                sys.exit(1)
+
+        args = {
+            "timeout": int(options.get("timeout", "300")),
+            "create_iterations": int(options.get("create-iterations", "10")),
+            "scale": int(options.get("scale", "10")),
+            "clients": int(options.get("clients", "4")),
+            "duration": int(options.get("duration", "30")),
+            "points": int(options.get("points", "200000")),
+            "polygons": int(options.get("polygons", "5000")),
+            "spatial_iterations": int(options.get("spatial-iterations", "5")),
+        }
+
+        for key in ("create_iterations", "spatial_iterations"):
+            if args[key] < 1:
+                print(f"❌ --{key.replace('_', '-')} 至少为 1")
+                sys.exit(1)
+
+        if options.get("build") == "true":
+            build_image(pg_major, image)
+
+        print("=" * 60)
+        print(f"镜像基准测试: {image}")
+        print("=" * 60)
+
+        results = {
+            "meta": {
+                "commit": get_git_commit(),
+                "image": image,
+                "pg_version": versions.get(pg_major, "unknown"),
+                "timestamp": datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ"),
+                "params": args,
+            },
+            "profiles": {},
+        }
+
+        for profile in profiles:
+            results["profiles"][profile] = run_profile(profile, image, args)
+
+        with open(output, 'w') as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+            f.write("\n")
+
+        print(f"\n✓ 结果已写入 {output}")
+
+    except Exception as e:
+        print(f"❌ 执行失败: {e}")
+        import traceback
+        traceback.print_exc()
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -8,7 +8,179 @@ import json
 import os
 import requests
 import re
+import time
 from typing import Dict, List, Optional
+from urllib.parse import urlparse
+
+
+# 外部服务地址，可通过环境变量指向本地 mock 服务（见 Scripts/mock-registry.py）
+DOCKER_HUB_API = os.getenv("DOCKER_HUB_API", "https://hub.docker.com/v2").rstrip("/")
+GITHUB_API = os.getenv("GITHUB_API_URL", "https://api.github.com").rstrip("/")
+PG_FTP_URL = os.getenv("PG_FTP_URL", "https://ftp.postgresql.org/pub/source/")
+
+# 请求埋点：设置 BUILD_HELPER_METRICS=1 启用，JSON lines 默认输出到 stderr，
+# 可通过 BUILD_HELPER_METRICS_FILE 指定文件；未启用时不计时也不记录
+METRICS_ENABLED = os.getenv("BUILD_HELPER_METRICS", "").lower() in ("1", "true", "yes")
+METRICS_FILE = os.getenv("BUILD_HELPER_METRICS_FILE")
+
+# 最低支持的主版本（PG13 及以下已 EOL），更高的主版本自动纳入
+MIN_SUPPORTED_MAJOR = 14
+
+_current_command = ""
+_call_metrics: List[Dict] = []
+
+
+def http_request(method: str, url: str, **kwargs) -> requests.Response:
+    """
+    发送 HTTP 请求，所有外部调用统一经过此函数
+
+    Args:
+        method: HTTP 方法
+        url: 请求地址
+        **kwargs: 透传给 requests.request 的参数
+
+    Returns:
+        响应对象
+    """
+    if not METRICS_ENABLED:
+        return requests.request(method, url, **kwargs)
+
+    started = time.perf_counter()
+    try:
+        response = requests.request(method, url, **kwargs)
+    except requests.RequestException as e:
+        record_call(method, url, kwargs.get("params"), None,
+                    time.perf_counter() - started, 0, 0, False, error=str(e))
+        raise
+
+    record_call(method, url, kwargs.get("params"), response.status_code,
+                time.perf_counter() - started, len(response.content), 0, False)
+    return response
+
+
+def record_call(
+    method: str,
+    url: str,
+    params: Optional[Dict],
+    status: Optional[int],
+    latency: float,
+    size: int,
+    retries: int,
+    cache_hit: bool,
+    error: Optional[str] = None
+) -> None:
+    """记录一次外部调用，并以 JSON line 形式输出"""
+    entry = {
+        "type": "call",
+        "command": _current_command,
+        "method": method,
+        "endpoint": url,
+        "params": params or {},
+        "status": status,
+        "latency_ms": round(latency * 1000, 1),
+        "bytes": size,
+        "retries": retries,
+        "cache_hit": cache_hit,
+    }
+    if error:
+        entry["error"] = error
+
+    _call_metrics.append(entry)
+    emit_metrics_line(entry)
+
+
+def emit_metrics_line(entry: Dict) -> None:
+    """输出一行 JSON 埋点数据"""
+    line = json.dumps(entry, ensure_ascii=False)
+    if METRICS_FILE:
+        with open(METRICS_FILE, 'a') as f:
+            f.write(line + "\n")
+    else:
+        print(line, file=sys.stderr)
+
+
+def normalize_endpoint(method: str, url: str) -> str:
+    """将调用地址归并为端点：去掉协议和主机，标签名、版本 ID 替换为占位符"""
+    path = urlparse(url).path
+    path = re.sub(r'/tags/[^/]+', '/tags/{tag}', path)
+    path = re.sub(r'/\d+(?=/|$)', '/{id}', path)
+    return f"{method} {path}"
+
+
+def is_error_call(call: Dict) -> bool:
+    """
+    判断调用是否失败
+    
+    异常和所有 >= 400 的状态码都计为错误；唯一例外是标签存在性探测
+    （GET .../tags/{tag}/）返回的 404，这是"标签不存在"的正常结果
+    """
+    status = call["status"]
+    if status is None:
+        return True
+    if status == 404:
+        endpoint = normalize_endpoint(call["method"], call["endpoint"])
+        return not (endpoint.startswith("GET ") and endpoint.endswith("/tags/{tag}/"))
+    return status >= 400
+
+
+def generate_metrics_summary(command: str) -> str:
+    """
+    汇总本次命令的外部调用
+
+    Args:
+        command: build-helper 命令名
+
+    Returns:
+        Markdown 格式的统计表格
+    """
+    groups: Dict[str, Dict] = {}
+    for call in _call_metrics:
+        key = normalize_endpoint(call["method"], call["endpoint"])
+        group = groups.setdefault(key, {
+            "calls": 0, "errors": 0, "statuses": {}, "retries": 0, "cache_hits": 0,
+            "bytes": 0, "latency_ms": 0.0, "max_latency_ms": 0.0,
+        })
+        group["calls"] += 1
+        if call["cache_hit"]:
+            status = "cache"
+        elif call["status"] is None:
+            status = "error"
+        else:
+            status = str(call["status"])
+        group["statuses"][status] = group["statuses"].get(status, 0) + 1
+        group["retries"] += call["retries"]
+        group["cache_hits"] += 1 if call["cache_hit"] else 0
+        group["bytes"] += call["bytes"]
+        group["latency_ms"] += call["latency_ms"]
+        group["max_latency_ms"] = max(group["max_latency_ms"], call["latency_ms"])
+        if not call["cache_hit"] and is_error_call(call):
+            group["errors"] += 1
+
+    totals = {
+        "type": "summary",
+        "command": command,
+        "calls": sum(g["calls"] for g in groups.values()),
+        "errors": sum(g["errors"] for g in groups.values()),
+        "retries": sum(g["retries"] for g in groups.values()),
+        "cache_hits": sum(g["cache_hits"] for g in groups.values()),
+        "bytes": sum(g["bytes"] for g in groups.values()),
+        "latency_ms": round(sum(g["latency_ms"] for g in groups.values()), 1),
+        "endpoints": groups,
+    }
+    emit_metrics_line(totals)
+
+    table = f"### 📡 build-helper {command} 外部调用统计\n\n"
+    table += "| 端点 | 次数 | 错误 | 状态码 | 重试 | 缓存命中 | 字节 | 总耗时 (ms) | 最大耗时 (ms) |\n"
+    table += "|------|------|------|--------|------|---------|------|------------|--------------|\n"
+    for key in sorted(groups, key=lambda k: groups[k]["latency_ms"], reverse=True):
+        g = groups[key]
+        statuses = ", ".join(f"{k}×{v}" for k, v in sorted(g["statuses"].items()))
+        table += (f"| `{key}` | {g['calls']} | {g['errors']} | {statuses} | {g['retries']} | {g['cache_hits']} "
+                  f"| {g['bytes']} | {g['latency_ms']:.1f} | {g['max_latency_ms']:.1f} |\n")
+    table += (f"| **合计** | {totals['calls']} | {totals['errors']} | | {totals['retries']} "
+              f"| {totals['cache_hits']} | {totals['bytes']} | {totals['latency_ms']:.1f} | |\n\n")
+
+    return table
 
 
 def parse_version(version_str: str) -> tuple:
@@ -23,13 +195,14 @@ def parse_version(version_str: str) -> tuple:
 def get_docker_hub_tags(max_pages: int = 10) -> Dict[str, str]:
     """从 Docker Hub 获取 postgres 镜像的所有 bookworm 标签，提取最新版本"""
     versions = {}
-    url = "https://hub.docker.com/v2/repositories/library/postgres/tags/"
+    url = f"{DOCKER_HUB_API}/repositories/library/postgres/tags/"
     
     print("从 Docker Hub 获取 postgres 镂像版本信息...")
     
     for page in range(1, max_pages + 1):
         try:
-            response = requests.get(
+            response = http_request(
+                "GET",
                 url,
                 params={"page": page, "page_size": 100, "name": "bookworm"},
                 timeout=30
@@ -46,7 +219,7 @@ def get_docker_hub_tags(max_pages: int = 10) -> Dict[str, str]:
                     minor = match.group(2)
                     full_version = f"{major}.{minor}"
                     
-                    if 14 <= int(major) <= 18:
+                    if int(major) >= MIN_SUPPORTED_MAJOR:
                         current = versions.get(major, "0.0")
                         if parse_version(full_version) > parse_version(current):
                             versions[major] = full_version
@@ -68,21 +241,22 @@ def get_versions_from_official_site() -> Dict[str, str]:
     versions = {}
     
     try:
-        response = requests.get(
-            "https://ftp.postgresql.org/pub/source/",
+        response = http_request(
+            "GET",
+            PG_FTP_URL,
             timeout=30
         )
         response.raise_for_status()
         
-        for major in range(14, 19):
-            pattern = rf'href="v({major}\.\d+)/"'
-            matches = re.findall(pattern, response.text)
-            
-            if matches:
-                sorted_versions = sorted(matches, key=lambda x: [int(n) for n in x.split('.')])
-                latest = sorted_versions[-1]
-                versions[str(major)] = latest
-                print(f"  PostgreSQL {major}: {latest} (from FTP)")
+        for major, minor in re.findall(r'href="v(\d+)\.(\d+)/"', response.text):
+            if int(major) < MIN_SUPPORTED_MAJOR:
+                continue
+            full_version = f"{major}.{minor}"
+            if parse_version(full_version) > parse_version(versions.get(major, "0.0")):
+                versions[major] = full_version
+        
+        for major in sorted(versions.keys(), key=int):
+            print(f"  PostgreSQL {major}: {versions[major]} (from FTP)")
                 
     except Exception as e:
         print(f"✗ FTP 方法失败: {e}", file=sys.stderr)
@@ -90,6 +264,88 @@ def get_versions_from_official_site() -> Dict[str, str]:
     return versions
 
 
+def probe_upstream_tag(version: str) -> Optional[bool]:
+    """
+    探测 Docker Hub 上 postgres:{version}-bookworm 标签是否存在
+    
+    Args:
+        version: 完整版本号 (如 "18.5")
+    
+    Returns:
+        True/False 表示存在/不存在，None 表示无法确定（限流、服务错误或网络异常）
+    """
+    url = f"{DOCKER_HUB_API}/repositories/library/postgres/tags/{version}-bookworm/"
+    
+    try:
+        response = http_request("GET", url, timeout=10)
+    except requests.RequestException as e:
+        print(f"⚠ 探测 postgres:{version}-bookworm 失败: {e}", file=sys.stderr)
+        return None
+    
+    if response.status_code == 200:
+        return True
+    if response.status_code == 404:
+        return False
+    
+    print(f"⚠ 探测 postgres:{version}-bookworm 失败: HTTP {response.status_code}", file=sys.stderr)
+    return None
+
+
+def get_incremental_versions(old_versions: Dict[str, str]) -> Optional[Dict[str, str]]:
+    """
+    以 pg_version.json 中的版本为高水位，仅探测更新的标签
+    
+    对每个主版本依次探测 {major}.{minor+1}-bookworm，直到标签不存在；
+    再探测 {最高主版本+1}.0-bookworm 以发现新的主版本
+    
+    Args:
+        old_versions: 当前记录的版本
+    
+    Returns:
+        最新版本，任一探测无法确定时返回 None（需回退到全量扫描）
+    """
+    print("增量检查: 仅探测比记录版本更新的 Docker Hub 标签...")
+    versions = {}
+    
+    for major in sorted(old_versions.keys(), key=int):
+        minor = parse_version(old_versions[major])[-1]
+        
+        while True:
+            exists = probe_upstream_tag(f"{major}.{minor + 1}")
+            if exists is None:
+                return None
+            if not exists:
+                break
+            minor += 1
+            print(f"  发现更新: PostgreSQL {major}: {major}.{minor}")
+        
+        versions[major] = f"{major}.{minor}"
+    
+    next_major = max([int(m) for m in old_versions] + [MIN_SUPPORTED_MAJOR - 1]) + 1
+    
+    while True:
+        exists = probe_upstream_tag(f"{next_major}.0")
+        if exists is None:
+            return None
+        if not exists:
+            break
+        
+        minor = 0
+        while True:
+            exists = probe_upstream_tag(f"{next_major}.{minor + 1}")
+            if exists is None:
+                return None
+            if not exists:
+                break
+            minor += 1
+        
+        versions[str(next_major)] = f"{next_major}.{minor}"
+        print(f"  发现新主版本: PostgreSQL {next_major}: {next_major}.{minor}")
+        next_major += 1
+    
+    return versions
+
+
 def has_version_changed(old_versions: Dict[str, str], new_versions: Dict[str, str]) -> bool:
     """检查版本是否有变化"""
     changed = False
@@ -109,15 +365,23 @@ def has_version_changed(old_versions: Dict[str, str], new_versions: Dict[str, st
                 print(f"📦 移除版本: PostgreSQL {major}: {old_ver}")
             changed = True
     
-    for major in ["14", "15", "16", "17", "18"]:
+    for major in sorted(old_versions.keys(), key=int):
         if major not in new_versions:
             print(f"⚠️ 警告: PostgreSQL {major} 在 Docker Hub 未找到")
     
     return changed
 
 
-def check_versions() -> bool:
-    """检查 PostgreSQL 版本更新"""
+def check_versions(full_scan: bool = False) -> bool:
+    """
+    检查 PostgreSQL 版本更新
+    
+    Args:
+        full_scan: 是否跳过增量检查，直接全量扫描 Docker Hub
+    
+    Returns:
+        True 如果版本有变化
+    """
     print("=" * 60)
     print("PostgreSQL Docker 镜像版本检查")
     print("=" * 60)
@@ -130,14 +394,31 @@ def check_versions() -> bool:
     
     print("\n开始检查 Docker Hub 上的最新版本...\n")
     
-    new_versions = get_docker_hub_tags()
+    new_versions = None
+    if old_versions and not full_scan:
+        new_versions = get_incremental_versions(old_versions)
+        if new_versions is None:
+            print("\n⚠️ 增量检查无法确定结果，回退到全量扫描...\n")
     
-    if len(new_versions) < 4:
-        print(f"\n⚠️ Docker Hub 只获取到 {len(new_versions)} 个版本，尝试备用方案...")
-        ftp_versions = get_versions_from_official_site()
-        for major, version in ftp_versions.items():
-            if major not in new_versions:
-                new_versions[major] = version
+    if new_versions is None:
+        new_versions = get_docker_hub_tags()
+        
+        if not new_versions or len(new_versions) < len(old_versions):
+            print(f"\n⚠️ Docker Hub 只获取到 {len(new_versions)} 个版本，尝试备用方案...")
+            ftp_versions = get_versions_from_official_site()
+            for major, version in ftp_versions.items():
+                if major not in new_versions:
+                    new_versions[major] = version
+        
+        # 全量扫描可能因上游错误而不完整，未取到或低于记录的主版本保留原版本，不做移除
+        for major in sorted(old_versions.keys(), key=int):
+            if parse_version(new_versions.get(major, "0.0")) < parse_version(old_versions[major]):
+                print(f"⚠️ 未获取到 PostgreSQL {major} 的最新版本，保留记录版本 {old_versions[major]}")
+                new_versions[major] = old_versions[major]
+    
+    if not new_versions:
+        print("\n✗ 未获取到任何版本，保留现有 pg_version.json", file=sys.stderr)
+        sys.exit(1)
     
     print(f"\nDocker Hub 最新可用版本:")
     for major in sorted(new_versions.keys()):
@@ -203,11 +484,11 @@ def get_build_matrix(pg_version: Optional[str] = None) -> List[str]:
     versions = load_versions()
     
     # 排除 PG13 及以下 (EOL)
-    supported_versions = [v for v in versions.keys() if int(v) >= 14]
+    supported_versions = [v for v in versions.keys() if int(v) >= MIN_SUPPORTED_MAJOR]
     
     if pg_version and pg_version != "all":
         if pg_version not in supported_versions:
-            print(f"❌ 不支持的版本: {pg_version}")
+            print(f"❌ 不支持的版本: {pg_version}（可选: {', '.join(sorted(supported_versions, key=int))}）")
             sys.exit(1)
         return [pg_version]
     
@@ -223,23 +504,62 @@ def check_upstream_image_exists(pg_major: str, pg_version: str) -> bool:
         pg_version: 完整版本号 (如 "14.21")
     
     Returns:
-        True 如果上游镜像存在
+        True 如果上游镜像存在，或因限流、服务错误等无法确定
     """
-    url = f"https://hub.docker.com/v2/repositories/library/postgres/tags/{pg_version}-bookworm/"
+    exists = probe_upstream_tag(pg_version)
     
-    try:
-        response = requests.get(url, timeout=10)
-        exists = response.status_code == 200
+    # 无法确定时不阻塞构建
+    if exists is None:
+        print(f"⚠ 检查上游镜像失败: postgres:{pg_version}-bookworm")
+        return True
+    
+    if exists:
+        print(f"✓ 上游镜像存在: postgres:{pg_version}-bookworm")
+    else:
+        print(f"✗ 上游镜像不存在: postgres:{pg_version}-bookworm")
+    
+    return exists
+
+
+def get_ghcr_versions(owner: str, package_name: str, token: str) -> Optional[List[Dict]]:
+    """
+    获取 GHCR 包的所有版本，按 Link 头逐页读取
+    
+    Args:
+        owner: 包所有者
+        package_name: 包名
+        token: GitHub Token
+    
+    Returns:
+        版本列表，包不存在时返回 None
+    
+    Raises:
+        requests.RequestException: 请求失败或返回其他错误状态码
+    """
+    url = f"{GITHUB_API}/users/{owner}/packages/container/{package_name}/versions"
+    params = {"per_page": 100}
+    versions = []
+    
+    while url:
+        response = http_request(
+            "GET",
+            url,
+            params=params,
+            headers={"Authorization": f"token {token}"},
+            timeout=30
+        )
         
-        if exists:
-            print(f"✓ 上游镜像存在: postgres:{pg_version}-bookworm")
-        else:
-            print(f"✗ 上游镜像不存在: postgres:{pg_version}-bookworm")
+        if response.status_code == 404:
+            return None
+        response.raise_for_status()
         
-        return exists
-    except requests.RequestException as e:
-        print(f"⚠ 检查上游镜像失败: {e}")
-        return True
+        versions.extend(response.json())
+        
+        # 下一页地址已包含查询参数
+        url = response.links.get("next", {}).get("url")
+        params = None
+    
+    return versions
 
 
 def get_all_ghcr_tags(registry: str = "freemankevin/postgresql-postgis") -> List[str]:
@@ -260,27 +580,14 @@ def get_all_ghcr_tags(registry: str = "freemankevin/postgresql-postgis") -> List
         print("⚠ 未设置 GITHUB_TOKEN，无法获取 GHCR 标签")
         return []
     
-    url = f"https://api.github.com/users/{owner}/packages/container/{package_name}/versions"
-    
     try:
-        response = requests.get(
-            url, 
-            headers={"Authorization": f"token {token}"}, 
-            timeout=30
-        )
+        versions = get_ghcr_versions(owner, package_name, token)
         
-        if response.status_code == 200:
-            versions = response.json()
-            tags = []
-            for version in versions:
-                version_tags = version.get("metadata", {}).get("container", {}).get("tags", [])
-                tags.extend(version_tags)
-            return tags
-        elif response.status_code == 404:
-            return []
-        else:
-            print(f"⚠ 获取 GHCR 标签失败: HTTP {response.status_code}")
-            return []
+        tags = []
+        for version in versions or []:
+            version_tags = version.get("metadata", {}).get("container", {}).get("tags", [])
+            tags.extend(version_tags)
+        return tags
     except requests.RequestException as e:
         print(f"⚠ 获取 GHCR 标签失败: {e}")
         return []
@@ -302,51 +609,71 @@ def get_ghcr_tags_for_major(pg_major: str, registry: str = "freemankevin/postgre
     return [tag for tag in all_tags if pattern.match(tag)]
 
 
-def delete_ghcr_tag(tag: str, token: str, registry: str = "freemankevin/postgresql-postgis") -> bool:
+def get_ghcr_version_ids(token: str, registry: str = "freemankevin/postgresql-postgis") -> Dict[str, int]:
     """
-    删除 GHCR 上的镜像标签
+    获取 GHCR 上标签到版本 ID 的映射
     
     Args:
-        tag: 要删除的标签
-        token: GitHub Token (需要 delete:packages 权限)
+        token: GitHub Token
         registry: 镜像仓库名
     
     Returns:
-        True 如果删除成功
+        {标签: 版本 ID}
     """
     owner = registry.split("/")[0]
     package_name = registry.split("/")[1]
     
-    url = f"https://api.github.com/users/{owner}/packages/container/{package_name}/versions"
+    version_ids = {}
+    for version in get_ghcr_versions(owner, package_name, token) or []:
+        for tag in version.get("metadata", {}).get("container", {}).get("tags", []):
+            if version.get("id"):
+                version_ids[tag] = version["id"]
+    return version_ids
+
+
+def delete_ghcr_version(
+    version_id: Optional[int],
+    tag: str,
+    token: str,
+    registry: str = "freemankevin/postgresql-postgis"
+) -> bool:
+    """
+    按版本 ID 删除 GHCR 上的镜像版本
     
-    try:
-        response = requests.get(url, headers={"Authorization": f"token {token}"}, timeout=30)
-        response.raise_for_status()
-        versions = response.json()
-        
-        for version in versions:
-            if tag in version.get("metadata", {}).get("container", {}).get("tags", []):
-                version_id = version.get("id")
-                if version_id:
-                    delete_url = f"https://api.github.com/users/{owner}/packages/container/{package_name}/versions/{version_id}"
-                    del_response = requests.delete(
-                        delete_url, 
-                        headers={"Authorization": f"token {token}"},
-                        timeout=30
-                    )
-                    if del_response.status_code == 204:
-                        print(f"✓ 已删除旧镜像标签: {tag}")
-                        return True
-                    else:
-                        print(f"✗ 删除标签 {tag} 失败: HTTP {del_response.status_code}")
-                        return False
-        
+    Args:
+        version_id: 版本 ID，None 表示未找到标签对应的版本
+        tag: 版本对应的标签（用于输出）
+        token: GitHub Token (需要 delete:packages 权限)
+        registry: 镜像仓库名
+    
+    Returns:
+        True 如果删除成功
+    """
+    if not version_id:
         print(f"⚠ 未找到标签 {tag} 对应的版本")
         return False
-        
+    
+    owner = registry.split("/")[0]
+    package_name = registry.split("/")[1]
+    versions_url = f"{GITHUB_API}/users/{owner}/packages/container/{package_name}/versions"
+    
+    try:
+        del_response = http_request(
+            "DELETE",
+            f"{versions_url}/{version_id}", 
+            headers={"Authorization": f"token {token}"},
+            timeout=30
+        )
     except requests.RequestException as e:
         print(f"✗ 删除标签 {tag} 失败: {e}")
         return False
+    
+    if del_response.status_code == 204:
+        print(f"✓ 已删除旧镜像标签: {tag}")
+        return True
+    
+    print(f"✗ 删除标签 {tag} 失败: HTTP {del_response.status_code}")
+    return False
 
 
 def cleanup_old_versions(
@@ -369,9 +696,22 @@ def cleanup_old_versions(
     """
     print(f"\n🔍 检查 PostgreSQL {pg_major} 的旧镜像标签...")
     
-    old_tags = get_ghcr_tags_for_major(pg_major, registry)
     deleted_tags = []
     
+    # 实际删除时一次性取得标签到版本 ID 的映射，标签也从中筛选，避免重复拉取整个版本列表
+    token = os.getenv("GITHUB_TOKEN")
+    version_ids = {}
+    if not dry_run and token:
+        try:
+            version_ids = get_ghcr_version_ids(token, registry)
+        except requests.RequestException as e:
+            print(f"  ✗ 获取 GHCR 版本列表失败: {e}")
+            return deleted_tags
+        pattern = re.compile(rf"^{pg_major}\.\d+$")
+        old_tags = [tag for tag in version_ids if pattern.match(tag)]
+    else:
+        old_tags = get_ghcr_tags_for_major(pg_major, registry)
+    
     if not old_tags:
         print(f"  未找到 PostgreSQL {pg_major} 的旧镜像标签")
         return deleted_tags
@@ -381,9 +721,8 @@ def cleanup_old_versions(
             print(f"  发现旧版本: {tag} (当前保留: {keep_version})")
             
             if not dry_run:
-                token = os.getenv("GITHUB_TOKEN")
                 if token:
-                    if delete_ghcr_tag(tag, token, registry):
+                    if delete_ghcr_version(version_ids.get(tag), tag, token, registry):
                         deleted_tags.append(tag)
                 else:
                     print(f"  ⚠ 未设置 GITHUB_TOKEN，无法删除")
@@ -408,10 +747,10 @@ def check_image_exists(version: str, registry: str = "ghcr.io/freemankevin/postg
     if registry.startswith("ghcr.io/"):
         return check_ghcr_image_exists(version, registry.replace("ghcr.io/", ""))
     
-    url = f"https://hub.docker.com/v2/repositories/{registry}/tags/{version}/"
+    url = f"{DOCKER_HUB_API}/repositories/{registry}/tags/{version}/"
     
     try:
-        response = requests.get(url, timeout=10)
+        response = http_request("GET", url, timeout=10)
         exists = response.status_code == 200
         
         if exists:
@@ -569,7 +908,7 @@ def main():
     if len(sys.argv) < 2:
         print("用法: build-helper.py <command> [args...]")
         print("命令:")
-        print("  check-versions             - 检查 PostgreSQL 版本更新")
+        print("  check-versions [--full]    - 检查 PostgreSQL 版本更新（默认增量，--full 全量扫描）")
         print("  update-readme              - 更新 README.md 版本表格")
         print("  matrix [version]           - 生成构建矩阵")
         print("  check <pg_major>           - 检查镜像是否存在")
@@ -579,11 +918,13 @@ def main():
         print("  cleanup-all                - 清理所有主版本的旧镜像")
         sys.exit(1)
     
+    global _current_command
     command = sys.argv[1]
+    _current_command = command
     
     try:
         if command == "check-versions":
-            check_versions()
+            check_versions(full_scan="--full" in sys.argv)
         
         elif command == "update-readme":
             success = update_readme()
@@ -697,7 +1038,7 @@ def main():
             all_deleted = {}
             
             for pg_major, keep_version in sorted(versions.items()):
-                if int(pg_major) < 14:
+                if int(pg_major) < MIN_SUPPORTED_MAJOR:
                     continue
                 deleted = cleanup_old_versions(pg_major, keep_version, dry_run=False)
                 if deleted:
@@ -720,6 +1061,15 @@ def main():
         import traceback
         traceback.print_exc()
         sys.exit(1)
+    
+    finally:
+        # 输出外部调用统计，并追加到 GitHub Actions 摘要
+        if METRICS_ENABLED and _call_metrics:
+            metrics_table = generate_metrics_summary(command)
+            github_step_summary = os.getenv('GITHUB_STEP_SUMMARY')
+            if github_step_summary:
+                with open(github_step_summary, 'a') as f:
+                    f.write(metrics_table)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,375 @@
+#!/usr/bin/env python3
+"""
+Docker Hub / GHCR / PostgreSQL FTP 本地 mock 服务
+用于离线测试和压测 build-helper.py，可配置分页数量、延迟、错误率和限流
+"""
+import sys
+import json
+import random
+import re
+import threading
+import time
+import zlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional
+from urllib.parse import parse_qs, urlparse
+
+
+# 已 EOL 主版本的最终小版本号（仅用于生成历史标签）
+EOL_FINAL_MINOR = 22
+
+# 官方镜像每个标签包含的平台，用于生成接近真实大小的响应
+HUB_ARCHITECTURES = [
+    ("amd64", ""), ("arm", "v5"), ("arm", "v7"), ("arm64", "v8"),
+    ("386", ""), ("mips64le", ""), ("ppc64le", ""), ("s390x", ""),
+]
+
+
+DEFAULT_CONFIG = {
+    "host": "127.0.0.1",
+    "port": 0,
+    "versions": "pg_version.json",
+    "bump": 0,
+    "extra_majors": 0,
+    "hub_tags": 0,
+    "eol_majors": 3,
+    "ghcr_versions": 0,
+    "ghcr_old_tags": 3,
+    "ghcr_per_page": 30,
+    "latency_ms": 0.0,
+    "jitter_ms": 0.0,
+    "error_rate": 0.0,
+    "rate_limit_rate": 0.0,
+    "seed": 42,
+    "verbose": False,
+}
+
+
+class MockRegistry:
+    """mock 服务的数据和统计状态"""
+
+    def __init__(self, config: Dict):
+        self.config = config
+        self.lock = threading.Lock()
+        self.random = random.Random(config["seed"])
+        self.stats = {"total": 0, "routes": {}, "status": {}, "bytes": 0}
+
+        with open(config["versions"], 'r') as f:
+            stored = json.load(f)
+        self.stored = stored
+
+        # 上游最新版本 = 记录版本 + bump，另可追加新的主版本
+        self.latest = {}
+        for major, version in stored.items():
+            minor = int(version.split(".")[1]) + config["bump"]
+            self.latest[major] = minor
+        top = max(int(m) for m in stored)
+        for i in range(1, config["extra_majors"] + 1):
+            self.latest[str(top + i)] = 0
+
+        self.hub_tags = self._build_hub_tags()
+        self.hub_tag_set = set(self.hub_tags)
+        self.ghcr_versions = self._build_ghcr_versions(stored)
+
+    def _build_hub_tags(self) -> List[str]:
+        """
+        生成 postgres 官方镜像的标签历史，按最近更新时间排列
+
+        包含已 EOL 的旧主版本、各主版本的 beta/rc 标签以及多种发行版后缀，
+        使默认场景下 name=bookworm 的列表与真实 Docker Hub 一样需要分页
+        """
+        majors = dict(self.latest)
+        oldest = min(int(m) for m in majors)
+        for major in range(oldest - self.config["eol_majors"], oldest):
+            majors[str(major)] = EOL_FINAL_MINOR
+
+        # 尚未正式发布的下一个主版本只有 beta 标签
+        prerelease = str(max(int(m) for m in majors) + 1)
+
+        tags = [f"{prerelease}beta1-bookworm", f"{prerelease}beta1-trixie", f"{prerelease}beta1"]
+        tags += ["bookworm", "trixie", "latest"]
+
+        # 每轮补丁发布会同时更新所有主版本的最新小版本
+        for offset in range(max(majors.values()) + 1):
+            for major in sorted(majors, key=int, reverse=True):
+                minor = majors[major] - offset
+                if minor < 0:
+                    continue
+                for suffix in ("bookworm", "trixie", "bullseye", "alpine"):
+                    tags.append(f"{major}.{minor}-{suffix}")
+                tags.append(f"{major}.{minor}")
+                if offset == 0:
+                    tags.append(f"{major}-bookworm")
+
+        for major in sorted(majors, key=int, reverse=True):
+            for pre in ("rc1", "beta3", "beta2", "beta1"):
+                tags.append(f"{major}{pre}-bookworm")
+                tags.append(f"{major}{pre}")
+
+        # 填充无关标签以放大分页规模
+        i = 0
+        while len(tags) < self.config["hub_tags"]:
+            tags.append(f"bookworm-snapshot-{i}")
+            i += 1
+        return tags
+
+    def _build_ghcr_versions(self, stored: Dict[str, str]) -> List[Dict]:
+        """生成 GHCR 包版本，包含当前标签、旧标签和无标签的历史版本"""
+        versions = []
+        next_id = 1
+
+        for major in sorted(stored, key=int, reverse=True):
+            minor = int(stored[major].split(".")[1])
+            for old in range(minor, max(minor - self.config["ghcr_old_tags"], 0) - 1, -1):
+                versions.append({
+                    "id": next_id,
+                    "name": f"sha256:{next_id:064x}",
+                    "metadata": {"container": {"tags": [f"{major}.{old}"]}},
+                })
+                next_id += 1
+
+        while len(versions) < self.config["ghcr_versions"]:
+            versions.append({
+                "id": next_id,
+                "name": f"sha256:{next_id:064x}",
+                "metadata": {"container": {"tags": []}},
+            })
+            next_id += 1
+        return versions
+
+    def hub_tag_detail(self, tag: str) -> Dict:
+        """生成与 Docker Hub 结构一致的标签详情"""
+        digest = f"sha256:{zlib.crc32(tag.encode()):064x}"
+        return {
+            "name": tag,
+            "full_size": 150000000,
+            "last_updated": "2026-01-01T00:00:00.000000Z",
+            "tag_status": "active",
+            "images": [
+                {
+                    "architecture": arch,
+                    "variant": variant or None,
+                    "os": "linux",
+                    "size": 150000000,
+                    "digest": digest,
+                    "status": "active",
+                    "last_pushed": "2026-01-01T00:00:00.000000Z",
+                }
+                for arch, variant in HUB_ARCHITECTURES
+            ],
+        }
+
+    def stale_tags(self) -> List[str]:
+        """仍留在 GHCR 上、且不是 pg_version.json 当前版本的旧标签"""
+        stale = []
+        with self.lock:
+            for version in self.ghcr_versions:
+                for tag in version["metadata"]["container"]["tags"]:
+                    major = tag.split(".")[0]
+                    if re.match(r'^\d+\.\d+$', tag) and tag != self.stored.get(major):
+                        stale.append(tag)
+        return sorted(stale, key=lambda t: [int(n) for n in t.split(".")])
+
+    def record(self, route: str, status: int, size: int) -> None:
+        """记录请求统计"""
+        with self.lock:
+            self.stats["total"] += 1
+            self.stats["routes"][route] = self.stats["routes"].get(route, 0) + 1
+            key = str(status)
+            self.stats["status"][key] = self.stats["status"].get(key, 0) + 1
+            self.stats["bytes"] += size
+
+    def inject_fault(self) -> Optional[int]:
+        """按配置注入延迟和错误，返回需要直接响应的状态码"""
+        with self.lock:
+            delay = self.config["latency_ms"] + self.random.uniform(0, self.config["jitter_ms"])
+            roll = self.random.random()
+
+        if delay > 0:
+            time.sleep(delay / 1000)
+
+        if roll < self.config["rate_limit_rate"]:
+            return 429
+        if roll < self.config["rate_limit_rate"] + self.config["error_rate"]:
+            return 500
+        return None
+
+
+def make_handler(registry: MockRegistry):
+    """创建绑定到指定 registry 的请求处理类"""
+
+    class Handler(BaseHTTPRequestHandler):
+        def log_message(self, format, *args):
+            if registry.config["verbose"]:
+                super().log_message(format, *args)
+
+        def respond(self, route: str, status: int, body: bytes = b"",
+                    content_type: str = "application/json", headers: Optional[Dict[str, str]] = None) -> None:
+            self.send_response(status)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(body)))
+            for key, value in (headers or {}).items():
+                self.send_header(key, value)
+            self.end_headers()
+            self.wfile.write(body)
+            if route:
+                registry.record(route, status, len(body))
+
+        def respond_json(self, route: str, status: int, data, headers: Optional[Dict[str, str]] = None) -> None:
+            self.respond(route, status, json.dumps(data).encode(), headers=headers)
+
+        def dispatch(self, method: str) -> None:
+            parsed = urlparse(self.path)
+            path = parsed.path
+            query = {k: v[-1] for k, v in parse_qs(parsed.query).items()}
+
+            if path == "/_stats":
+                with registry.lock:
+                    data = json.loads(json.dumps(registry.stats))
+                data["ghcr_stale_tags"] = registry.stale_tags()
+                self.respond_json("", 200, data)
+                return
+
+            route = self.route_name(method, path)
+            fault = registry.inject_fault()
+            if fault == 429:
+                self.respond_json(route, 429, {"message": "rate limited"}, headers={"Retry-After": "1"})
+                return
+            if fault:
+                self.respond_json(route, fault, {"message": "injected error"})
+                return
+
+            if route == "GET hub.tags.list":
+                self.hub_tags_list(route, query)
+            elif route == "GET hub.tag":
+                tag = path.rstrip("/").split("/")[-1]
+                repo = path.split("/repositories/")[1].split("/tags/")[0]
+                exists = repo == "library/postgres" and tag in registry.hub_tag_set
+                self.respond_json(route, 200 if exists else 404,
+                                  registry.hub_tag_detail(tag) if exists else {"message": "tag not found"})
+            elif route == "GET ghcr.versions":
+                self.ghcr_versions_list(route, query)
+            elif route == "DELETE ghcr.version":
+                version_id = int(path.rstrip("/").split("/")[-1])
+                with registry.lock:
+                    before = len(registry.ghcr_versions)
+                    registry.ghcr_versions = [v for v in registry.ghcr_versions if v["id"] != version_id]
+                    deleted = len(registry.ghcr_versions) < before
+                self.respond(route, 204 if deleted else 404)
+            elif route == "GET ftp.index":
+                self.ftp_index(route)
+            else:
+                self.respond_json(route, 404, {"message": "not found"})
+
+        def route_name(self, method: str, path: str) -> str:
+            if re.match(r'^/v2/repositories/[^/]+/[^/]+/tags/?$', path):
+                return f"{method} hub.tags.list"
+            if re.match(r'^/v2/repositories/[^/]+/[^/]+/tags/[^/]+/?$', path):
+                return f"{method} hub.tag"
+            if re.match(r'^/(users|orgs)/[^/]+/packages/container/[^/]+/versions/?$', path):
+                return f"{method} ghcr.versions"
+            if re.match(r'^/(users|orgs)/[^/]+/packages/container/[^/]+/versions/\d+/?$', path):
+                return f"{method} ghcr.version"
+            if path.rstrip("/") == "/pub/source":
+                return f"{method} ftp.index"
+            return f"{method} unknown"
+
+        def hub_tags_list(self, route: str, query: Dict[str, str]) -> None:
+            page = int(query.get("page", "1"))
+            page_size = min(int(query.get("page_size", "10")), 100)
+            name = query.get("name", "")
+
+            tags = [t for t in registry.hub_tags if name in t]
+            start = (page - 1) * page_size
+            results = [registry.hub_tag_detail(t) for t in tags[start:start + page_size]]
+            if not results and page > 1:
+                self.respond_json(route, 404, {"message": "page not found"})
+                return
+
+            has_next = start + page_size < len(tags)
+            base = f"http://{self.headers.get('Host')}{urlparse(self.path).path}"
+            self.respond_json(route, 200, {
+                "count": len(tags),
+                "next": f"{base}?page={page + 1}&page_size={page_size}&name={name}" if has_next else None,
+                "results": results,
+            })
+
+        def ghcr_versions_list(self, route: str, query: Dict[str, str]) -> None:
+            page = int(query.get("page", "1"))
+            per_page = min(int(query.get("per_page", str(registry.config["ghcr_per_page"]))), 100)
+
+            with registry.lock:
+                versions = list(registry.ghcr_versions)
+            start = (page - 1) * per_page
+            headers = {}
+            if start + per_page < len(versions):
+                base = f"http://{self.headers.get('Host')}{urlparse(self.path).path}"
+                headers["Link"] = f'<{base}?per_page={per_page}&page={page + 1}>; rel="next"'
+            self.respond_json(route, 200, versions[start:start + per_page], headers=headers)
+
+        def ftp_index(self, route: str) -> None:
+            lines = ["<html><body><pre>"]
+            for major in sorted(registry.latest, key=int):
+                for minor in range(registry.latest[major] + 1):
+                    lines.append(f'<a href="v{major}.{minor}/">v{major}.{minor}/</a>')
+            lines.append("</pre></body></html>")
+            self.respond(route, 200, "\n".join(lines).encode(), content_type="text/html")
+
+        def do_GET(self):
+            self.dispatch("GET")
+
+        def do_DELETE(self):
+            self.dispatch("DELETE")
+
+    return Handler
+
+
+def parse_args(argv: List[str]) -> Dict:
+    """解析 --key value 形式的参数"""
+    config = dict(DEFAULT_CONFIG)
+    i = 0
+    while i < len(argv):
+        arg = argv[i]
+        key = arg[2:].replace("-", "_")
+        if not arg.startswith("--") or key not in config:
+            print(f"❌ 无法识别的参数: {arg}")
+            sys.exit(1)
+        if isinstance(config[key], bool):
+            config[key] = True
+            i += 1
+            continue
+        if i + 1 >= len(argv):
+            print(f"❌ 缺少参数值: {arg}")
+            sys.exit(1)
+        config[key] = type(config[key])(argv[i + 1])
+        i += 2
+    return config
+
+
+def main():
+    """主函数"""
+    if "-h" in sys.argv or "--help" in sys.argv:
+        print("用法: mock-registry.py [--option value ...]")
+        print("选项:")
+        for key, value in DEFAULT_CONFIG.items():
+            print(f"  --{key.replace('_', '-'):<18} 默认 {value}")
+        print("环境变量:")
+        print("  DOCKER_HUB_API=<url>/v2  GITHUB_API_URL=<url>  PG_FTP_URL=<url>/pub/source/")
+        sys.exit(0)
+
+    config = parse_args(sys.argv[1:])
+    registry = MockRegistry(config)
+    server = ThreadingHTTPServer((config["host"], config["port"]), make_handler(registry))
+    host, port = server.server_address[:2]
+
+    print(f"Mock 服务已启动: http://{host}:{port}", flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()